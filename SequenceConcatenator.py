@@ -1,9 +1,156 @@
+from __future__ import annotations # Annotations such as tuple[int, int] | None are not evaluated at runtime
+
+import collections
 import re
-import math
+import os
 import sys # Import sys for stderr output
 import traceback
 
 
+# Whitespace and digits (line numbers) removed from sequence text. The translation table covers the ASCII
+# characters matched by the regex, so ASCII text is cleaned in a single C-level pass without the regex engine.
+_WS_DIGITS_RE = re.compile(r'[\s\d]+')
+_WS_DIGITS_DEL = str.maketrans('', '', "".join(char for char in map(chr, range(128)) if _WS_DIGITS_RE.match(char)))
+# The same deletions combined with uppercasing of ASCII letters, for parsers that return uppercase sequences
+_WS_DIGITS_DEL_UPPER = {**_WS_DIGITS_DEL, **str.maketrans('abcdefghijklmnopqrstuvwxyz', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ')}
+# Translation table deleting spaces and tabs from header-less single-sequence content
+_SPACE_TAB_DEL = str.maketrans('', '', ' \t')
+
+# Maximum number of parsed gene files kept in the (opt-in) cache shared by SequenceConcatenator instances
+_PARSE_CACHE_MAX_ENTRIES = 64
+# Maximum number of reference taxa whose divergence results an instance keeps for reuse
+_DIVERGENCE_CACHE_MAX_ENTRIES = 16
+
+# Regular expressions used by the parsers, compiled once at import time
+_FASTA_HEADER_RE = re.compile(r'>\s*(.+)')
+_FASTA_RECORD_SPLIT_RE = re.compile(r'\n[ \t\r\f\v\x1c-\x1f]*>')
+_NEXUS_COMMENT_RE = re.compile(r'\[.*?\]')
+# Quoted taxon name at the start of a MATRIX row: 'single-quoted' (a doubled '' is a literal quote) or "double-quoted"
+_NEXUS_QUOTED_NAME_RE = re.compile(r"'((?:[^']|'')*)'|\"([^\"]*)\"")
+_NEXUS_NCHAR_RE = re.compile(r'\bnchar\s*=\s*(\d+)', re.IGNORECASE)
+_NEXUS_INTERLEAVE_RE = re.compile(r'\binterleave(?:\s*=\s*(\w+))?', re.IGNORECASE)
+_GB_ORGANISM_RE = re.compile(r'^\s{2,}ORGANISM\s+(.*?)\s*\.?$', re.IGNORECASE)
+_GB_ORGANISM_QUALIFIER_RE = re.compile(r'/organism="([^"]+)"', re.IGNORECASE)
+
+# Alphabets used to determine whether a gene holds DNA or protein sequences
+_DNA_CHARS = "ACGTU"
+_PROTEIN_CHARS = "ACDEFGHIKLMNPQRSTVWY"
+_DNA_CHARS_STRICT = _DNA_CHARS + "RYSWKMBDHVN" # Including ambiguity codes
+_PROTEIN_CHARS_STRICT = _PROTEIN_CHARS + "BJZX" # Including ambiguity codes
+_DNA_SPECIFIC_CHARS = "TU"
+_PROTEIN_SPECIFIC_CHARS = "FILPQEKRWYV"
+# ASCII whitespace (as matched by str.isspace) and gap symbols, ignored when determining the sequence type
+_WS_GAP_BYTES = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f-?"
+# bytes.translate table marking each site of an ASCII sequence: 0x00 for the gap symbols '-'/'?', 0xFF for anything else
+_NON_GAP_MASK_TABLE = bytes(0x00 if chr(byte) in '-?' else 0xFF for byte in range(256))
+# The same alphabets as bytes, used as bytes.translate deletion sets on ASCII sequences
+_DNA_BYTES_STRICT = _DNA_CHARS_STRICT.encode('ascii')
+_PROTEIN_BYTES_STRICT = _PROTEIN_CHARS_STRICT.encode('ascii')
+_DNA_BYTES = _DNA_CHARS.encode('ascii')
+_PROTEIN_BYTES = _PROTEIN_CHARS.encode('ascii')
+_DNA_SPECIFIC_BYTES = _DNA_SPECIFIC_CHARS.encode('ascii')
+_PROTEIN_SPECIFIC_BYTES = _PROTEIN_SPECIFIC_CHARS.encode('ascii')
+
+
+def _delete_ws_digits(text: str) -> str:
+    """
+    Removes whitespace and digits from sequence text, using str.translate for ASCII text.
+    """
+    return text.translate(_WS_DIGITS_DEL) if text.isascii() else _WS_DIGITS_RE.sub('', text)
+
+
+def _delete_ws_digits_upper(text: str) -> str:
+    """
+    Removes whitespace and digits from sequence text and uppercases it; ASCII text is cleaned and
+    uppercased by a single str.translate call.
+    """
+    return text.translate(_WS_DIGITS_DEL_UPPER) if text.isascii() else _WS_DIGITS_RE.sub('', text).upper()
+
+
+def _detect_sequence_type(sequence: str) -> str:
+    """
+    Classifies a sequence as 'DNA', 'Protein' or 'Unknown' from the residue symbols it contains
+    (case-insensitive, ignoring whitespace and the gap symbols '-' and '?').
+    """
+    if sequence.isascii():
+        # Every alphabet test is one C-level bytes.translate pass plus a length comparison,
+        # instead of building a set from each character of a possibly long sequence
+        residues = sequence.encode('ascii').upper().translate(None, _WS_GAP_BYTES)
+        is_potential_dna = not residues.translate(None, _DNA_BYTES_STRICT)
+        is_potential_protein = not residues.translate(None, _PROTEIN_BYTES_STRICT)
+        # Deleting a set of symbols shortens the residues exactly when any of them occurs
+        has_protein_chars = len(residues.translate(None, _PROTEIN_BYTES)) < len(residues)
+        has_dna_chars = len(residues.translate(None, _DNA_BYTES)) < len(residues)
+        has_dna_specific_chars = len(residues.translate(None, _DNA_SPECIFIC_BYTES)) < len(residues)
+        has_protein_specific_chars = len(residues.translate(None, _PROTEIN_SPECIFIC_BYTES)) < len(residues)
+    else:
+        # Non-ASCII text: upper() may map some letters to ASCII ones, so work on the actual characters
+        residues = {char for char in "".join(set(sequence)).upper() if not char.isspace() and char not in "-?"}
+        is_potential_dna = residues.issubset(_DNA_CHARS_STRICT)
+        is_potential_protein = residues.issubset(_PROTEIN_CHARS_STRICT)
+        has_protein_chars = not residues.isdisjoint(_PROTEIN_CHARS)
+        has_dna_chars = not residues.isdisjoint(_DNA_CHARS)
+        has_dna_specific_chars = not residues.isdisjoint(_DNA_SPECIFIC_CHARS)
+        has_protein_specific_chars = not residues.isdisjoint(_PROTEIN_SPECIFIC_CHARS)
+
+    if not residues: return 'Unknown'
+    elif is_potential_dna and not has_protein_chars: return 'DNA'
+    elif is_potential_protein and not has_dna_chars: return 'Protein'
+    elif is_potential_dna and is_potential_protein:
+         if has_dna_specific_chars: return 'DNA'
+         elif has_protein_specific_chars: return 'Protein'
+         else: return 'Unknown'
+    else: return 'Unknown'
+
+
+def _encode_sequence(sequence: str) -> tuple[int, int] | None:
+    """
+    Encodes an ASCII sequence for _differing_sites as two integers with one byte per site:
+    the upper-cased symbols and a non-gap mask (0xFF for every site that is not '-' or '?').
+    Returns None for sequences with non-ASCII characters.
+    """
+    if not sequence.isascii():
+        return None
+    sequence_bytes = sequence.encode('ascii')
+    return int.from_bytes(sequence_bytes.upper(), 'little'), int.from_bytes(sequence_bytes.translate(_NON_GAP_MASK_TABLE), 'little')
+
+
+def _differing_sites(encoded_ref: tuple[int, int], encoded_taxon: tuple[int, int], length: int) -> bytes:
+    """
+    Compares two sequences encoded by _encode_sequence at every site at once. Both must have been
+    encoded (not None); sequences with non-ASCII characters are compared with _count_differences instead.
+
+    Returns:
+        One byte for each of the first `length` sites, non-zero where both sequences have a non-gap
+        symbol and the symbols differ case-insensitively.
+    """
+    # XOR-ing the upper-cased symbols leaves a non-zero byte where they differ, and AND-ing with both
+    # non-gap masks clears the sites where either sequence has a gap: a few C-level big-integer operations
+    ref_symbols, ref_non_gap = encoded_ref
+    taxon_symbols, taxon_non_gap = encoded_taxon
+    return ((ref_symbols ^ taxon_symbols) & ref_non_gap & taxon_non_gap).to_bytes(length, 'little')
+
+
+def _count_differences(ref_segment: str, taxon_segment: str) -> int:
+    """
+    Counts the sites where both segments have a non-gap symbol and the symbols differ case-insensitively,
+    character by character. Used for sequences with non-ASCII characters.
+    """
+    diff_count = 0
+    for ref_char, taxon_char in zip(ref_segment, taxon_segment):
+        if ref_char not in ('-', '?') and taxon_char not in ('-', '?') and ref_char.upper() != taxon_char.upper():
+            diff_count += 1
+    return diff_count
+
+
+def _has_non_gap(sequence: str, start: int, end: int) -> bool:
+    """
+    Tells whether sequence[start:end] contains any symbol other than the gap symbols '-' and '?',
+    counting the gaps with str.count over the range instead of slicing and testing each character.
+    """
+    return sequence.count('-', start, end) + sequence.count('?', start, end) < end - start
+
+
 class SequenceConcatenator:
     """
     A class to parse gene sequence files (FASTA, Nexus, GenBank),
@@ -11,8 +158,13 @@ class SequenceConcatenator:
     and partition information, including per-taxon per-gene divergence.
     """
 
+    # Parse results shared across instances created with use_parse_cache=True:
+    # {(tuple(file_lines), gene_name): (parsed_data, sequence_type)}. Each entry keeps the file's lines and its
+    # parsed sequences alive until it is evicted or clear_parse_cache() is called, so the cache is opt-in.
+    _parse_cache = {}
+
     # Accept gene_names from the frontend
-    def __init__(self, gene_file_contents: list[list[str]], gene_names: list[str]):
+    def __init__(self, gene_file_contents: list[list[str]], gene_names: list[str], use_parse_cache: bool = False):
         """
         Initializes the SequenceConcatenator with raw gene file contents and their names.
 
@@ -21,6 +173,8 @@ class SequenceConcatenator:
                                 representing the lines of a single gene file.
             gene_names: A list of strings, representing the names assigned to each gene file.
                         Must be the same length as gene_file_contents.
+            use_parse_cache: Reuse (and store) parse results in the cache shared by all instances, for callers
+                             that repeatedly submit the same files. Off by default, as the cache holds on to them.
         """
         if len(gene_file_contents) != len(gene_names):
              # This check should ideally prevent issues, caught in the frontend
@@ -30,22 +184,35 @@ class SequenceConcatenator:
 
         self.__raw_gene_contents = gene_file_contents
         self.__frontend_gene_names = gene_names # Store the names passed from frontend
+        self.__use_parse_cache = use_parse_cache
         self.__parsed_gene_data = [] # [{'taxon1': 'seq1', 'taxon2': 'seq2', ...}, ...] list of dicts per gene
         self.__gene_info = [] # Stores info like {'name': 'GeneName', 'type': 'DNA', 'length': 100, 'start': 1, 'end': 100}
         self.__all_taxons = [] # All taxons found across all input files (before concatenation filtering)
+        self.__all_taxons_set = set() # Same taxons, collected while the parsed genes are accepted
 
-        self.__concatenated_sequences = {} # {taxon_name: concatenated_sequence, ...} - Only taxons with data after concat
+        # {taxon_name: concatenated_sequence, ...} - Only taxons with data after concat.
+        # Sequences are kept as str: ASCII strings are already stored at 1 byte/char by CPython, and the
+        # frontend edits this dict in place (taxon renames), so it must stay the dict[str, str] it is handed.
+        self.__concatenated_sequences = {}
+        self.__missing_data_counts = {} # {taxon_name: [missing count per gene in __gene_info order], ...} - Filled during concat
         self.__partition_data = [] # [(gene_name, 'start-end', gene_type), ...]
-        self.__statistics = {} # Dictionary holding various stats, including initial divergence
+        self.__statistics = None # Dictionary holding various stats, including initial divergence - Filled on first request
+        self.__statistics_alignment = None # (taxons, {taxon: sequence}) as constructed - Consumed by the first statistics request
+        self.__divergence_cache = {} # {reference_taxon: divergence data} - Results of recalculate_divergence_using_internal_data
+        self.__divergence_cache_state = None # [(taxon, sequence), ...] the cached results were calculated from
 
 
         self._parse_all_genes()
         self._collect_all_taxons() # Collects all taxons from parsed data
         # _concatenate_sequences filters to taxons with data and sets lengths/positions in __gene_info
         self.__concatenated_sequences = self._concatenate_sequences()
+        # The parsed per-gene data is not needed once concatenated; drop it so the instance (which the
+        # frontend keeps alive) does not hold a second copy of every sequence. With use_parse_cache the
+        # shared parse cache still references the parsed data, so the copy is only freed on eviction/clearing.
+        self.__parsed_gene_data = []
 
         # Filter __all_taxons to only include those that actually ended up in concatenated sequences
-        self.__all_taxons = sorted(list(self.__concatenated_sequences.keys()))
+        self.__all_taxons = sorted(self.__concatenated_sequences)
 
         # Only keep gene_info entries that resulted in a non-zero length in the concatenation
         self.__gene_info = [info for info in self.__gene_info if info.get('length', 0) > 0]
@@ -53,9 +220,35 @@ class SequenceConcatenator:
 
         # _calculate_partition uses the updated __gene_info
         self.__partition_data = self._calculate_partition()
-        # _calculate_statistics calculates various stats including the *initial* divergence relative to the first taxon
-        self.__statistics = self._calculate_statistics() # This call now uses the modified _perform_divergence_calculation which defaults to the first taxon
+        # Statistics (including the *initial* divergence relative to the first taxon, the most expensive step)
+        # are calculated by get_statistics on first use, so callers that only need the alignment skip them.
+        # They describe the alignment as constructed, but the frontend renames taxa in the dict returned by
+        # get_concatenated_sequences, so they are calculated from a snapshot of the taxon names and sequences
+        # (a shallow copy: the sequence strings are shared, not duplicated)
+        self.__statistics_alignment = (list(self.__all_taxons), dict(self.__concatenated_sequences))
+
+
+    @classmethod
+    def from_paths(cls, paths: list[str], gene_names: list[str] = None, use_parse_cache: bool = False) -> "SequenceConcatenator":
+        """
+        Creates a SequenceConcatenator directly from gene file paths.
+
+        Args:
+            paths: Paths of the gene files (FASTA, Nexus or GenBank).
+            gene_names: Names to assign to each gene file. Defaults to the file names without extension,
+                        as used by the frontend.
+            use_parse_cache: Passed on to the constructor.
+        """
+        if gene_names is None:
+             gene_names = [os.path.splitext(os.path.basename(path))[0] for path in paths]
 
+        gene_file_contents = []
+        for path in paths:
+             # Same decoding as the frontend, so both produce identical line lists
+             with open(path, "r", encoding='utf-8', errors='ignore') as f:
+                  gene_file_contents.append(f.readlines())
+
+        return cls(gene_file_contents, gene_names, use_parse_cache)
 
     def get_concatenated_sequences(self) -> dict[str, str]:
         """
@@ -66,7 +259,23 @@ class SequenceConcatenator:
     def get_statistics(self) -> dict:
         """
         Returns the calculated statistics for the concatenated alignment.
+        They are calculated on the first call and reused afterwards.
         """
+        if self.__statistics is None:
+             taxons_in_concat, concatenated_sequences = self.__statistics_alignment
+             # _calculate_statistics uses _perform_divergence_calculation, which defaults to the first taxon
+             self.__statistics = self._calculate_statistics(taxons_in_concat, concatenated_sequences)
+             self.__statistics_alignment = None # Only needed once
+
+             # The initial divergence is the result for the default reference of the constructed alignment, so it
+             # seeds the divergence cache (as a private copy: callers edit the returned statistics). This is skipped
+             # if the cache already belongs to a different alignment, e.g. after the frontend renamed taxa.
+             divergence_data = self.__statistics.get("Divergence Data")
+             alignment_state = [(taxon, concatenated_sequences[taxon]) for taxon in taxons_in_concat]
+             if divergence_data and self.__divergence_cache_state in (None, alignment_state):
+                  self.__divergence_cache_state = alignment_state
+                  if taxons_in_concat[0] not in self.__divergence_cache:
+                       self._cache_divergence(taxons_in_concat[0], {taxon: dict(taxon_divergence) for taxon, taxon_divergence in divergence_data.items()})
         return self.__statistics
 
     def get_partition(self) -> list[tuple[str, str, str]]:
@@ -84,6 +293,24 @@ class SequenceConcatenator:
          return list(self.__gene_info)
 
 
+    @classmethod
+    def clear_parse_cache(cls) -> None:
+        """
+        Drops the parse results cached for previously seen gene files, releasing their memory.
+        """
+        cls._parse_cache.clear()
+
+
+    def _cache_divergence(self, reference_taxon: str, divergence_data: dict) -> None:
+        """
+        Stores the divergence data calculated relative to reference_taxon for the alignment in __divergence_cache_state.
+        """
+        self.__divergence_cache[reference_taxon] = divergence_data
+        # Evict the oldest entries (dicts keep insertion order) to bound the cache's memory
+        while len(self.__divergence_cache) > _DIVERGENCE_CACHE_MAX_ENTRIES:
+             del self.__divergence_cache[next(iter(self.__divergence_cache))]
+
+
     # New public method to recalculate divergence using the instance's *internal* data
     def recalculate_divergence_using_internal_data(self, reference_taxon_name: str = None) -> dict:
         """
@@ -99,14 +326,32 @@ class SequenceConcatenator:
         """
         # Use the internal data and pass them to the core calculation logic
         # Use the final list of taxons from concatenated sequences
-        taxons_in_concat = sorted(list(self.__concatenated_sequences.keys()))
-
-        return self._perform_divergence_calculation(
-            self.__concatenated_sequences,
-            self.__gene_info, # Pass the processed gene_info (only genes with length > 0)
-            taxons_in_concat, # Pass current taxons in concat
-            reference_taxon_name
-        )
+        taxons_in_concat = sorted(self.__concatenated_sequences)
+
+        # Results are reused per reference taxon while the alignment is unchanged. The frontend renames taxa
+        # in the concatenated sequences dict, so the cache is dropped whenever the current (taxon, sequence)
+        # pairs differ from those it was built from (unchanged sequences compare by identity, so this is cheap).
+        alignment_state = [(taxon, self.__concatenated_sequences[taxon]) for taxon in taxons_in_concat]
+        if alignment_state != self.__divergence_cache_state:
+             self.__divergence_cache = {}
+             self.__divergence_cache_state = alignment_state
+
+        # Same reference resolution as _perform_divergence_calculation: invalid or None means the first taxon
+        if reference_taxon_name is None or reference_taxon_name not in taxons_in_concat:
+             reference_taxon_name = taxons_in_concat[0] if taxons_in_concat else None
+
+        divergence_data = self.__divergence_cache.get(reference_taxon_name)
+        if divergence_data is None:
+             divergence_data = self._perform_divergence_calculation(
+                 self.__concatenated_sequences,
+                 self.__gene_info, # Pass the processed gene_info (only genes with length > 0)
+                 taxons_in_concat, # Pass current taxons in concat
+                 reference_taxon_name
+             )
+             self._cache_divergence(reference_taxon_name, divergence_data)
+
+        # Callers edit the returned data (e.g. the frontend re-keys renamed taxa), so each call gets its own copy
+        return {taxon: dict(taxon_divergence) for taxon, taxon_divergence in divergence_data.items()}
 
 
     # Internal parsing methods remain the same
@@ -118,76 +363,33 @@ class SequenceConcatenator:
         """
         self.__parsed_gene_data = [] # Clear existing data on re-parse
         self.__gene_info = []      # Clear existing info on re-parse
+        self.__all_taxons_set = set()
 
-        for i, file_lines in enumerate(self.__raw_gene_contents):
-            content_str = "".join(file_lines).strip()
-            current_gene_name = self.__frontend_gene_names[i] if i < len(self.__frontend_gene_names) else f"gene_index_{i+1}"
+        num_files = len(self.__raw_gene_contents)
+        gene_names = [self.__frontend_gene_names[i] if i < len(self.__frontend_gene_names) else f"gene_index_{i+1}" for i in range(num_files)]
 
-            parsed_data = {}
-            determined_seq_type = 'Unknown'
-
-            try:
-                is_nexus = content_str.lower().strip().startswith('#nexus') or 'begin data' in content_str.lower()
-                is_genbank = content_str.lower().strip().startswith('locus') or 'origin' in content_str.lower() or 'version' in content_str.lower() or 'ncbi' in content_str.lower()
-                is_fasta = content_str.strip().startswith('>')
-
-                if is_nexus:
-                    parsed_data = self._parse_nexus(file_lines)
-                elif is_genbank:
-                    parsed_data = self._parse_genbank(file_lines)
-                elif is_fasta:
-                    parsed_data = self._parse_fasta(file_lines)
-                else:
-                     # Try FASTA as a default
-                    parsed_data = self._parse_fasta(file_lines)
-                    if not parsed_data:
-                         # Simple single-sequence fallback
-                         non_empty_lines = [line.strip() for line in file_lines if line.strip() and not line.strip().startswith('#') and not line.strip().startswith('[')]
-                         if non_empty_lines:
-                              seq_content = "".join(non_empty_lines).replace(' ', '').replace('\t','')
-                              if seq_content:
-                                  dummy_taxon_name = f"Taxon_for_{current_gene_name}_File"
-                                  print(f"Info: Gene file index {i+1} ('{current_gene_name}') contains data but no recognized header. Treating as simple single-sequence for taxon '{dummy_taxon_name}'.", file=sys.stderr)
-                                  parsed_data = {dummy_taxon_name: seq_content}
-                                  if not seq_content:
-                                      print(f"Warning: Gene file index {i+1} ('{current_gene_name}') had lines but yielded no sequence data after cleaning.", file=sys.stderr)
-                                      parsed_data = {}
-
-                # Determine sequence type
-                if parsed_data:
-                    first_seq = next((re.sub(r'[\s\-?]+', '', seq).upper() for seq in parsed_data.values() if seq), "")
-
-                    if first_seq:
-                         dna_chars = set("ACGTU")
-                         protein_chars = set("ACDEFGHIKLMNPQRSTVWY")
-                         ambiguous_dna = set("RYSWKMBDHVN")
-                         ambiguous_protein = set("BJZX")
-                         all_dna_chars_strict = dna_chars | ambiguous_dna
-                         all_protein_chars_strict = protein_chars | ambiguous_protein
-                         seq_chars_present = set(first_seq)
-
-                         is_potential_dna = seq_chars_present.issubset(all_dna_chars_strict)
-                         is_potential_protein = seq_chars_present.issubset(all_protein_chars_strict)
-
-                         if not seq_chars_present: determined_seq_type = 'Unknown'
-                         elif is_potential_dna and not (seq_chars_present & protein_chars): determined_seq_type = 'DNA'
-                         elif is_potential_protein and not (seq_chars_present & dna_chars): determined_seq_type = 'Protein'
-                         elif is_potential_dna and is_potential_protein:
-                              if seq_chars_present & set("TU"): determined_seq_type = 'DNA'
-                              elif seq_chars_present & set("FILPQEKRWYV"): determined_seq_type = 'Protein'
-                              else: determined_seq_type = 'Unknown'
-                         else: determined_seq_type = 'Unknown'
-
-                    if parsed_data:
-                         self.__parsed_gene_data.append(parsed_data)
-                         # Initialize gene info with length 0 and placeholder positions
-                         self.__gene_info.append({'name': current_gene_name, 'type': determined_seq_type, 'length': 0, 'start': 0, 'end': 0})
-                    else:
-                         print(f"Warning: Gene file index {i+1} ('{current_gene_name}') parsed but yielded no sequences.", file=sys.stderr)
-
-            except Exception as e:
-                print(f"Error parsing gene file index {i+1} ('{current_gene_name}'): {e}", file=sys.stderr)
-                traceback.print_exc(file=sys.stderr)
+        # Reuse results for files parsed before (e.g. re-submitting the same loaded genes) when the caller opted in
+        if self.__use_parse_cache:
+            cache_keys = [(tuple(file_lines), gene_name) for file_lines, gene_name in zip(self.__raw_gene_contents, gene_names)]
+            parse_results = [SequenceConcatenator._parse_cache.get(key) for key in cache_keys]
+        else:
+            parse_results = [None] * num_files
+        pending = [i for i, result in enumerate(parse_results) if result is None]
+        for i in pending:
+            parse_results[i] = self._parse_gene_file(self.__raw_gene_contents[i], gene_names[i], i)
+        if self.__use_parse_cache:
+            for i in pending:
+                SequenceConcatenator._parse_cache[cache_keys[i]] = parse_results[i]
+            # Evict the oldest entries (dicts keep insertion order) to bound the cache's memory
+            while len(SequenceConcatenator._parse_cache) > _PARSE_CACHE_MAX_ENTRIES:
+                del SequenceConcatenator._parse_cache[next(iter(SequenceConcatenator._parse_cache))]
+
+        for current_gene_name, (parsed_data, determined_seq_type) in zip(gene_names, parse_results):
+            if parsed_data:
+                 self.__parsed_gene_data.append(parsed_data)
+                 self.__all_taxons_set.update(parsed_data)
+                 # Initialize gene info with length 0 and placeholder positions
+                 self.__gene_info.append({'name': current_gene_name, 'type': determined_seq_type, 'length': 0, 'start': 0, 'end': 0})
 
         # Filter out genes that resulted in no parsed data dictionaries
         valid_genes_data = []
@@ -209,17 +411,117 @@ class SequenceConcatenator:
         self.__gene_info = initial_gene_info_before_concat # Use this list to be updated in concat
 
 
-    def _parse_fasta(self, lines: list[str]) -> dict[str, str]:
+    @classmethod
+    def _parse_gene_file(cls, file_lines: list[str], current_gene_name: str, file_index: int) -> tuple[dict[str, str], str]:
+        """
+        Detects the format of a single gene file, parses it and determines its sequence type.
+        Kept free of instance state: the result only depends on the file's lines and name, so it can be shared
+        through the parse cache.
+
+        Returns:
+            A tuple of (parsed data dict, sequence type). The dict is empty if nothing could be parsed.
+        """
+        parsed_data = {}
+        determined_seq_type = 'Unknown'
+
+        try:
+            # The first non-blank line identifies standard files without scanning (or copying) the whole content
+            first_line = next((line.strip() for line in file_lines if line.strip()), "")
+            first_line_lower = first_line[:6].lower()
+            is_nexus = first_line_lower == '#nexus'
+            is_genbank = first_line_lower.startswith('locus')
+            is_fasta = first_line.startswith('>')
+
+            if not (is_nexus or is_genbank or is_fasta):
+                # Non-standard start: fall back to searching the whole content for format keywords
+                content_lower = "".join(file_lines).lower()
+                is_nexus = 'begin data' in content_lower
+                is_genbank = 'origin' in content_lower or 'version' in content_lower or 'ncbi' in content_lower
+
+            if is_nexus:
+                parsed_data = cls._parse_nexus(file_lines)
+            elif is_genbank:
+                parsed_data = cls._parse_genbank(file_lines)
+            elif is_fasta:
+                parsed_data = cls._parse_fasta(file_lines)
+            else:
+                 # Try FASTA as a default, unless there is no '>' at all: the FASTA parser would then find no record
+                 # (the content was already joined and lowercased above, so the check costs no extra pass over the lines)
+                if '>' in content_lower:
+                     parsed_data = cls._parse_fasta(file_lines)
+                if not parsed_data:
+                     # Simple single-sequence fallback
+                     stripped_lines = (line.strip() for line in file_lines)
+                     non_empty_lines = [line for line in stripped_lines if line and not line.startswith(('#', '['))]
+                     if non_empty_lines:
+                          seq_content = "".join(non_empty_lines).translate(_SPACE_TAB_DEL)
+                          if seq_content:
+                              dummy_taxon_name = f"Taxon_for_{current_gene_name}_File"
+                              print(f"Info: Gene file index {file_index+1} ('{current_gene_name}') contains data but no recognized header. Treating as simple single-sequence for taxon '{dummy_taxon_name}'.", file=sys.stderr)
+                              parsed_data = {dummy_taxon_name: seq_content}
+                              if not seq_content:
+                                  print(f"Warning: Gene file index {file_index+1} ('{current_gene_name}') had lines but yielded no sequence data after cleaning.", file=sys.stderr)
+                                  parsed_data = {}
+
+            # Identical sequences (replicates, identical haplotypes) share one string object, so the parsed
+            # data, the parse cache and the concatenation columns hold each distinct sequence only once.
+            # Taxon names are interned, so the same name parsed from different gene files is one object
+            # and the taxon lookups across genes compare by identity.
+            sequence_pool = {}
+            parsed_data = {sys.intern(taxon): sequence_pool.setdefault(sequence, sequence) for taxon, sequence in parsed_data.items()}
+
+            # Determine sequence type from the first non-empty sequence
+            if parsed_data:
+                determined_seq_type = _detect_sequence_type(next((seq for seq in parsed_data.values() if seq), ""))
+
+        except Exception as e:
+            print(f"Error parsing gene file index {file_index+1} ('{current_gene_name}'): {e}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
+            parsed_data = {}
+
+        return parsed_data, determined_seq_type
+
+
+    @classmethod
+    def _parse_fasta(cls, lines: list[str]) -> dict[str, str]:
+        """
+        Parses FASTA lines into a {taxon: sequence} dictionary.
+        Plain ASCII files without comment lines are scanned record by record on the joined text,
+        cleaning each sequence with a single translate call; anything else is parsed line by line.
+        """
+        text = "".join(lines)
+        # The record scan relies on each element being exactly one newline-terminated line, as produced by readlines()
+        one_line_per_element = bool(lines) and all(line.endswith("\n") for line in lines[:-1]) \
+                               and text.count("\n") == len(lines) - (not lines[-1].endswith("\n"))
+        if not one_line_per_element or not text.isascii() or "#" in text:
+            return cls._parse_fasta_lines(lines)
+
+        sequences = {}
+        # Records start at every line whose first non-blank character is '>'; text before the first header is ignored
+        for record in _FASTA_RECORD_SPLIT_RE.split("\n" + text)[1:]:
+            header, _, body = record.partition("\n")
+            current_name = header.strip()
+            if not current_name:
+                 current_name = f"UnnamedTaxon_{len(sequences) + 1}"
+                 print(f"Warning: Found FASTA header with no name. Assigning default name '{current_name}'.", file=sys.stderr)
+            # Like the line parser, keep only records with at least one non-blank sequence line
+            if body and not body.isspace():
+                sequences[current_name] = body.translate(_WS_DIGITS_DEL)
+        return sequences
+
+    @staticmethod
+    def _parse_fasta_lines(lines: list[str]) -> dict[str, str]:
         sequences = {}
         current_name = None
         current_seq_lines = []
-        processed_lines = [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
 
-        for line in processed_lines:
+        for raw_line in lines:
+            line = raw_line.strip()
+            if not line or line.startswith('#'): continue
             if line.startswith(">"):
                 if current_name is not None and current_seq_lines:
                     sequences[current_name] = "".join(current_seq_lines)
-                match = re.match(r'>\s*(.+)', line)
+                match = _FASTA_HEADER_RE.match(line)
                 if match: current_name = match.group(1).strip()
                 else: current_name = line[1:].strip()
                 if not current_name:
@@ -227,108 +529,180 @@ class SequenceConcatenator:
                      print(f"Warning: Found FASTA header with no name. Assigning default name '{current_name}'.", file=sys.stderr)
                 current_seq_lines = []
             elif current_name is not None:
-                clean_seq_line = re.sub(r'[\s\d]+', '', line)
-                current_seq_lines.append(clean_seq_line)
+                current_seq_lines.append(_delete_ws_digits(line))
         if current_name is not None and current_seq_lines:
             sequences[current_name] = "".join(current_seq_lines)
         return sequences
 
-    def _parse_nexus(self, lines: list[str]) -> dict[str, str]:
+    @staticmethod
+    def _parse_nexus(lines: list[str]) -> dict[str, str]:
         sequences = {}
         in_matrix = False
-        taxon_sequences_buffer = {}
+        matrix_closed = False # The ';' ending the MATRIX command was seen; rows are ignored until END;
+        nchar = None # NCHAR from the DIMENSIONS command, used to tell continuation lines from named rows
+        interleaved = False # FORMAT INTERLEAVE: every MATRIX line starts with a taxon name
+        # Sequence parts per taxon in row order; interleaved blocks append to the same list and every
+        # taxon is joined once when the matrix ends
+        taxon_sequences_buffer = collections.defaultdict(list)
+        taxon_lengths = collections.defaultdict(int) # Characters read so far per taxon (whitespace and digits excluded)
         current_taxon = None
         inside_block_level = 0
 
+        def finalize_matrix():
+            for t, seq_parts in taxon_sequences_buffer.items():
+                if t not in sequences:
+                    sequences[t] = "".join(seq_parts)
+            taxon_sequences_buffer.clear()
+            taxon_lengths.clear()
+
+        def split_row(row):
+            # (taxon name, rest of the row); a quoted name may contain spaces and '' for a literal quote
+            if row[0] in "'\"":
+                match = _NEXUS_QUOTED_NAME_RE.match(row)
+                if match:
+                    name = match.group(1).replace("''", "'") if match.group(1) is not None else match.group(2)
+                    return name, row[match.end():].strip()
+            tokens = row.split(None, 1)
+            return tokens[0], tokens[1] if len(tokens) > 1 else ""
+
         for raw_line in lines:
             line = raw_line.strip()
             if not line: continue
             if '[' in line and ']' in line:
-                 line = re.sub(r'\[.*?\]', '', line).strip()
+                 line = _NEXUS_COMMENT_RE.sub('', line).strip()
                  if not line: continue
-            line_lower = line.lower()
+            # Keywords are short, so only a prefix is lower-cased; long MATRIX rows are never lower-cased whole
+            keyword_prefix = line[:6].lower()
 
-            if line_lower.startswith('begin'):
+            if keyword_prefix.startswith('begin'):
                  inside_block_level += 1
-                 if ' data;' in line_lower and inside_block_level == 1:
+                 if ' data;' in line.lower() and inside_block_level == 1:
                       sequences = {}
                       in_matrix = False
-                      taxon_sequences_buffer = {}
+                      taxon_sequences_buffer.clear()
+                      taxon_lengths.clear()
                       current_taxon = None
+                      nchar = None
+                      interleaved = False
                  continue
-            if line_lower.startswith('end;'):
+            if keyword_prefix.startswith('end;'):
                  if in_matrix:
-                      if current_taxon is not None and current_taxon in taxon_sequences_buffer:
-                           sequences[current_taxon] = "".join(taxon_sequences_buffer[current_taxon])
-                           del taxon_sequences_buffer[current_taxon]
-                      for t, seq_parts in list(taxon_sequences_buffer.items()):
-                           if t not in sequences:
-                              sequences[t] = "".join(seq_parts)
-                           del taxon_sequences_buffer[t]
+                      finalize_matrix()
+                      current_taxon = None
                       in_matrix = False
                  inside_block_level = max(0, inside_block_level - 1)
                  continue
-            if in_matrix:
-                match = re.match(r"^\s*(?:(['\"])(.*?)\1|([^'\s]+))\s*(\S+)\s*;", line)
-                if not match: match = re.match(r"^\s*(?:(['\"])(.*?)\1|([^'\s]+))\s*(\S+)", line)
-                if match:
-                    quoted_name = match.group(2)
-                    unquoted_name = match.group(3)
-                    taxon_name = quoted_name if quoted_name is not None else unquoted_name
-                    sequence_part = match.group(4).strip()
-                    if taxon_name:
-                        if current_taxon is not None and current_taxon != taxon_name and current_taxon in taxon_sequences_buffer:
-                             if taxon_sequences_buffer[current_taxon]:
-                                  if current_taxon not in sequences:
-                                       sequences[current_taxon] = "".join(taxon_sequences_buffer[current_taxon])
-                        current_taxon = taxon_name
-                        if taxon_name not in taxon_sequences_buffer: taxon_sequences_buffer[taxon_name] = []
-                        taxon_sequences_buffer[taxon_name].append(sequence_part)
-                elif current_taxon is not None:
-                     sequence_part = line.replace(';', '').strip()
-                     if sequence_part:
-                          if current_taxon in taxon_sequences_buffer:
-                               taxon_sequences_buffer[current_taxon].append(sequence_part)
-
-        for t, seq_parts in taxon_sequences_buffer.items():
-             if t not in sequences:
-                  sequences[t] = "".join(seq_parts)
-
-        cleaned_sequences = {name: re.sub(r'[\s\d]+', '', seq).upper() for name, seq in sequences.items() if seq.strip()}
+            if not in_matrix:
+                 if keyword_prefix == 'dimens':
+                      nchar_match = _NEXUS_NCHAR_RE.search(line)
+                      if nchar_match: nchar = int(nchar_match.group(1))
+                 elif keyword_prefix == 'format':
+                      interleave_match = _NEXUS_INTERLEAVE_RE.search(line)
+                      if interleave_match: interleaved = (interleave_match.group(1) or 'yes').lower() != 'no'
+                 elif keyword_prefix == 'matrix' and (len(line) == 6 or line[6].isspace()):
+                      # MATRIX starts the taxon/sequence rows; a row may follow the keyword on the same line
+                      in_matrix = True
+                      matrix_closed = False
+                      line = line[6:].strip()
+                 if not in_matrix or not line: continue
+            if matrix_closed: continue
+            if ';' in line:
+                 line = line[:line.index(';')].strip()
+                 matrix_closed = True
+                 if not line: continue
+
+            # A line starts a new row (taxon name, then sequence) unless it continues a sequential row:
+            # with NCHAR known, that is while the current taxon is still short of NCHAR characters;
+            # without it, a line that is a single unquoted token is taken as a continuation
+            if interleaved or current_taxon is None:
+                 starts_row = True
+            elif nchar is not None:
+                 starts_row = taxon_lengths[current_taxon] >= nchar
+            else:
+                 starts_row = line[0] in "'\"" or len(line.split(None, 1)) > 1
+            if starts_row:
+                 current_taxon, sequence_part = split_row(line)
+                 if not current_taxon:
+                      current_taxon = None
+                      continue
+            else:
+                 sequence_part = line
+            # Blocks separated by whitespace are all kept; whitespace and digits are removed when the sequences are cleaned
+            if sequence_part:
+                 taxon_sequences_buffer[current_taxon].append(sequence_part)
+                 # Only sequential rows need the lengths: interleaved rows are always named
+                 if nchar is not None and not interleaved:
+                      taxon_lengths[current_taxon] += len(_delete_ws_digits(sequence_part))
+
+        finalize_matrix()
+
+        cleaned_sequences = {name: _delete_ws_digits_upper(seq) for name, seq in sequences.items() if seq.strip()}
         return cleaned_sequences
 
 
-    def _parse_genbank(self, lines: list[str]) -> dict[str, str]:
+    @staticmethod
+    def _parse_genbank(lines: list[str]) -> dict[str, str]:
         sequences = {}
         current_organism_name = None
         in_origin = False
         sequence_parts = []
-
-        for line in lines:
+        origin_block_jump = True
+
+        def finalize_record(organism_name, parts):
+            # ORIGIN lines are kept raw and the record is cleaned in one pass over the joined text
+            if organism_name is not None and parts:
+                clean_sequence = _delete_ws_digits_upper("".join(parts))
+                if clean_sequence:
+                    sequences[organism_name] = clean_sequence
+
+        line_index = 0
+        while line_index < len(lines):
+            line = lines[line_index]
+            line_index += 1
             line_stripped = line.rstrip()
-            if not line_stripped.strip(): continue
-
-            if line_stripped.strip() == '//':
-                if current_organism_name is not None and sequence_parts:
-                    sequence = "".join(sequence_parts)
-                    clean_sequence = re.sub(r'[\s\d]+', '', sequence).upper()
-                    if clean_sequence:
-                         sequences[current_organism_name] = clean_sequence
+            content = line_stripped.lstrip()
+            if not content: continue
+
+            # ORIGIN block lines start with a base position; such a line cannot be '//', 'ORIGIN' or an
+            # ORGANISM line, so it is collected without running the record checks below
+            if in_origin and content[0].isdigit():
+                sequence_parts.append(line_stripped)
+                continue
+
+            if content == '//':
+                finalize_record(current_organism_name, sequence_parts)
                 current_organism_name = None
                 in_origin = False
                 sequence_parts = []
                 continue
 
-            org_match = re.match(r'^\s{2,}ORGANISM\s+(.*?)\s*\.?$', line_stripped, re.IGNORECASE)
+            org_match = _GB_ORGANISM_RE.match(line_stripped)
             if org_match:
                 current_organism_name = org_match.group(1).strip()
                 in_origin = False
                 sequence_parts = []
                 continue
 
-            if line_stripped.strip().lower() == 'origin':
+            if content.lower() == 'origin':
                 in_origin = True
                 sequence_parts = []
+                # Inside the block only a '//', ORGANISM or ORIGIN line changes the outcome; every other line is
+                # collected. An ASCII block up to the record's '//' line without any '/', 'o' or 'O' can hold none
+                # of them, so it is taken whole after a few C-level scans instead of a loop iteration per line.
+                if origin_block_jump:
+                    try:
+                        block_end = lines.index('//\n', line_index)
+                    except ValueError:
+                        # No plain terminator lines: stop searching ahead once per record
+                        origin_block_jump = False
+                        continue
+                    block = "".join(lines[line_index:block_end])
+                    if block.isascii() and '/' not in block and 'o' not in block and 'O' not in block:
+                        sequence_parts = [block]
+                        line_index = block_end
+                    else:
+                        # The '//' line found may belong to a later record; read the rest of the file line by line
+                        origin_block_jump = False
                 continue
 
             if in_origin:
@@ -336,15 +710,11 @@ class SequenceConcatenator:
                 continue
 
             if current_organism_name is None:
-                 org_feature_match = re.search(r'/organism="([^"]+)"', line_stripped, re.IGNORECASE)
+                 org_feature_match = _GB_ORGANISM_QUALIFIER_RE.search(line_stripped)
                  if org_feature_match:
                       current_organism_name = org_feature_match.group(1).strip()
 
-        if current_organism_name is not None and sequence_parts:
-             sequence = "".join(sequence_parts)
-             clean_sequence = re.sub(r'[\s\d]+', '', sequence).upper()
-             if clean_sequence:
-                   sequences[current_organism_name] = clean_sequence
+        finalize_record(current_organism_name, sequence_parts)
 
         cleaned_sequences = {name: seq for name, seq in sequences.items() if seq}
         return cleaned_sequences
@@ -356,11 +726,9 @@ class SequenceConcatenator:
         This list includes all taxons found in *any* gene file *that was successfully parsed*.
         This list is used as the basis for creating the concatenated sequences dictionary keys.
         """
-        all_taxons_set = set()
-        # Iterate through the data dictionaries that were successfully parsed
-        for gene_data_dict in self.__parsed_gene_data:
-            all_taxons_set.update(gene_data_dict.keys())
-        self.__all_taxons = sorted(list(all_taxons_set))
+        # The taxon names were already gathered in _parse_all_genes as each gene was accepted.
+        # The sort is kept: the first taxon in alphabetical order is the default divergence reference.
+        self.__all_taxons = sorted(self.__all_taxons_set)
 
 
     def _concatenate_sequences(self) -> dict[str, str]:
@@ -369,11 +737,16 @@ class SequenceConcatenator:
         Adds gaps for missing data or sequences of unexpected length.
         Updates the length and position info in __gene_info for genes
         that successfully contributed sequence data.
-        Filters the final concatenated sequences to only include taxons that were in __all_taxons
-         and had non-empty sequences after concatenation.
+        Every taxon in __all_taxons gets a sequence of the full alignment length.
         """
-        # Initialize concatenated sequences for all taxons collected from *successfully parsed* genes
-        concatenated_sequences = {taxon: "" for taxon in self.__all_taxons}
+        # Each contributing gene becomes a column of fragments with one row per taxon collected from
+        # *successfully parsed* genes. Rows are joined once at the end instead of growing each sequence
+        # with repeated string concatenation.
+        taxon_rows = {taxon: row for row, taxon in enumerate(self.__all_taxons)}
+        num_taxa = len(self.__all_taxons)
+        sequence_columns = []
+        # Missing-data ('-'/'?') count of each (taxon, gene) fragment, in the same layout, for _calculate_statistics
+        missing_count_columns = []
         current_position = 1 # 1-based indexing for partition/gene_info
 
         # We will build a *new* gene_info list containing only genes that had length > 0
@@ -415,24 +788,28 @@ class SequenceConcatenator:
                   gene_end = current_position + gene_length - 1
                   updated_gene_info.append({'name': gene_name, 'type': gene_type, 'length': gene_length, 'start': gene_start, 'end': gene_end})
 
-                  # Now, append the sequence (or gaps) for each taxon to the concatenated sequence
-                  for taxon in self.__all_taxons: # Iterate through ALL taxons found initially from *parsed* data
-                      sequence = gene_data_dict.get(taxon) # Get sequence for this taxon from this gene's data
-
-                      if sequence is not None:
-                          # If taxon was present in this gene's data dictionary
-                          if len(sequence) == gene_length:
-                              concatenated_sequences[taxon] += sequence
-                          else:
-                              # Length mismatch - pad or truncate
-                              print(f"Warning: Taxon '{taxon}' sequence for gene '{gene_name}' has unexpected length ({len(sequence)} vs {gene_length}). Padding/Truncating.", file=sys.stderr)
-                              if len(sequence) < gene_length:
-                                  concatenated_sequences[taxon] += sequence + "-" * (gene_length - len(sequence))
-                              else: # len(sequence) > gene_length
-                                  concatenated_sequences[taxon] += sequence[:gene_length]
-                      else:
-                          # Taxon is missing from this gene_data_dict, append gaps of the expected length
-                          concatenated_sequences[taxon] += "-" * gene_length
+                  # Every row starts as gaps of the expected length (taxon missing from this gene); only the taxa
+                  # present in this gene's data are then filled in, so absent taxa cost no per-taxon lookup
+                  sequence_column = ["-" * gene_length] * num_taxa
+                  missing_count_column = [gene_length] * num_taxa
+                  # Taxa whose sequence had an unexpected length; reported in one line per gene instead of per taxon
+                  mismatched_length_count = 0
+
+                  for taxon, sequence in gene_data_dict.items():
+                      if len(sequence) != gene_length:
+                          # Length mismatch - pad or truncate
+                          mismatched_length_count += 1
+                          # ljust pads shorter sequences with gaps, the slice truncates longer ones
+                          sequence = sequence.ljust(gene_length, "-")[:gene_length]
+                      row = taxon_rows[taxon]
+                      sequence_column[row] = sequence
+                      missing_count_column[row] = sequence.count('-') + sequence.count('?')
+
+                  if mismatched_length_count:
+                      print(f"Warning: Gene '{gene_name}' had {mismatched_length_count} taxa with unexpected sequence length (expected {gene_length}). Padded/Truncated.", file=sys.stderr)
+
+                  sequence_columns.append(sequence_column)
+                  missing_count_columns.append(missing_count_column)
 
                   # Update the current position for the next gene ONLY if this gene had non-zero length
                   current_position += gene_length
@@ -444,24 +821,23 @@ class SequenceConcatenator:
         # Update the official __gene_info list to contain only genes with length > 0 and updated positions
         self.__gene_info = updated_gene_info
 
-        # Filter out taxons that ended up with zero length sequences (e.g., if all genes failed to parse for that taxon)
-        # Or simply keep taxons whose sequence length matches the total alignment length (due to padding)
-        expected_total_length = sum(info.get('length', 0) for info in self.__gene_info)
-        final_concatenated_sequences = {
-            taxon: seq for taxon, seq in concatenated_sequences.items() if len(seq) == expected_total_length # Only keep if sequence length matches
-        }
-
-        # Update __all_taxons to reflect only taxons actually present in the final alignment
-        self.__all_taxons = sorted(list(final_concatenated_sequences.keys()))
+        # Transpose the gene columns into taxon rows and join each row into its concatenated sequence in a single pass
+        # (without any contributing gene every taxon gets an empty row)
+        sequence_rows = zip(*sequence_columns) if sequence_columns else [()] * num_taxa
+        concatenated_sequences = {taxon: "".join(parts) for taxon, parts in zip(self.__all_taxons, sequence_rows)}
+        missing_count_rows = zip(*missing_count_columns) if missing_count_columns else [()] * num_taxa
+        self.__missing_data_counts = {taxon: list(counts) for taxon, counts in zip(self.__all_taxons, missing_count_rows)}
 
-        # Final check: ensure all remaining concatenated sequences have the same total length (should be true due to filtering)
-        if self.__all_taxons:
-             sample_seq_len = len(next(iter(final_concatenated_sequences.values())))
-             if sample_seq_len != expected_total_length:
-                  print(f"Internal Error: Final concatenated sequences have inconsistent total length ({sample_seq_len} vs expected {expected_total_length}). This indicates a bug in concatenation logic.", file=sys.stderr)
+        # Every row is joined from one fragment per contributing gene, each padded/truncated to the gene length,
+        # so all sequences already have the total alignment length and no taxon needs to be filtered out here.
+        # __all_taxons is left as is: it is sorted and holds exactly the keys of concatenated_sequences
+        if __debug__:
+             expected_total_length = sum(info.get('length', 0) for info in self.__gene_info)
+             if any(len(seq) != expected_total_length for seq in concatenated_sequences.values()):
+                  print(f"Internal Error: Final concatenated sequences have inconsistent total length (expected {expected_total_length}). This indicates a bug in concatenation logic.", file=sys.stderr)
 
 
-        return final_concatenated_sequences
+        return concatenated_sequences
 
 
     def _calculate_partition(self) -> list[tuple[str, str, str]]:
@@ -470,37 +846,29 @@ class SequenceConcatenator:
         (containing only genes that contributed length > 0).
         Positions are 1-based.
         """
-        partition = []
         # Use the __gene_info list updated by _concatenate_sequences
         # This list already contains only genes with length > 0 and valid ranges
-        for gene_info in self.__gene_info:
-            gene_name = gene_info['name']
-            start = gene_info['start']
-            end = gene_info['end']
-            gene_type = gene_info.get('type', 'Unknown')
-
-            partition.append((gene_name, f"{start}-{end}", gene_type))
-
-        return partition
+        # Built in a single comprehension rather than an append loop
+        return [(gene_info['name'], f"{gene_info['start']}-{gene_info['end']}", gene_info.get('type', 'Unknown'))
+                for gene_info in self.__gene_info]
 
 
-    def _calculate_statistics(self) -> dict:
+    def _calculate_statistics(self, taxons_in_concat: list[str], concatenated_sequences: dict[str, str]) -> dict:
         """
         Calculates various statistics, including per-taxon per-gene divergence.
-        This method uses the final concatenated sequences and gene info.
-        Initial divergence is calculated relative to the first taxon in __all_taxons.
+        This method uses the given final taxons and concatenated sequences, and the gene info.
+        Initial divergence is calculated relative to the first taxon in taxons_in_concat.
         """
         statistics = {}
 
         # Calculate statistics based on the FINAL concatenated sequences and gene info
-        taxons_in_concat = self.__all_taxons # Use the final list of taxons from concatenated sequences
         num_taxa = len(taxons_in_concat)
         statistics["Number of Taxa"] = num_taxa
         # Count genes that contributed sequence (those in the final __gene_info list)
         statistics["Number of Genes"] = len(self.__gene_info)
 
 
-        if num_taxa == 0 or not self.__concatenated_sequences:
+        if num_taxa == 0 or not concatenated_sequences:
              statistics["Total Length"] = 0
              statistics["Percentage Overall Missing Data (%)"] = 0.0
              statistics["Missing Data per Taxon (count)"] = {}
@@ -510,41 +878,35 @@ class SequenceConcatenator:
              statistics["Divergence Data"] = {} # Initial divergence data is empty if no taxons/data
              return statistics
 
-        total_length = len(next(iter(self.__concatenated_sequences.values()))) # Safely get length
+        total_length = len(next(iter(concatenated_sequences.values()))) # Safely get length
         statistics["Total Length"] = total_length
 
         total_cells = num_taxa * total_length if total_length > 0 else 0
         total_missing_chars = 0
         missing_data_per_taxon = {}
 
-        for taxon in taxons_in_concat:
-            seq = self.__concatenated_sequences.get(taxon, "")
-            missing_count = seq.count("-") + seq.count("?")
-            missing_data_per_taxon[taxon] = missing_count
-            total_missing_chars += missing_count
-
-        statistics["Missing Data per Taxon (count)"] = missing_data_per_taxon
-
-
-        # Calculate missing data per gene based on concatenated sequences
+        # Missing-data counts of every (taxon, gene) cell were recorded while concatenating, so no sequence is
+        # rescanned here: rows give the per-taxon counts, columns the per-gene counts, and a cell is fully
+        # missing when its count equals the gene length (sparsity)
         # Use the final __gene_info list (only genes with length > 0)
         missing_data_per_gene = {info['name']: 0 for info in self.__gene_info}
-        for gene_info in self.__gene_info:
-             gene_name = gene_info['name']
-             start_0based = gene_info['start'] - 1
-             end_0based = gene_info['end']
-             # gene_segment_length = gene_info['length'] # No need, use slice length
-
-
-             if start_0based >= 0 and end_0based >= start_0based and total_length >= end_0based:
-                  for taxon in taxons_in_concat:
-                       seq = self.__concatenated_sequences.get(taxon, "")
-                       if seq and len(seq) >= end_0based:
-                            seq_segment = seq[start_0based:end_0based]
-                            missing_count_segment = seq_segment.count("-") + seq_segment.count("?")
-                            missing_data_per_gene[gene_name] += missing_count_segment
-                       # else: Warning already printed in concatenation if padding failed
+        num_genes_in_concat = len(self.__gene_info) # Number of genes with length > 0
+        num_expected_gene_segments = num_taxa * num_genes_in_concat if num_genes_in_concat > 0 else 0
+        num_fully_missing_gene_segments = 0
+        # (name, length) of each gene, looked up once rather than in every (taxon, gene) cell
+        gene_names_and_lengths = [(info['name'], info['length']) for info in self.__gene_info]
+
+        for taxon in taxons_in_concat:
+             taxon_missing_counts = self.__missing_data_counts.get(taxon, [])
+             missing_data_per_taxon[taxon] = sum(taxon_missing_counts)
+             total_missing_chars += missing_data_per_taxon[taxon]
 
+             for (gene_name, gene_length), missing_count_segment in zip(gene_names_and_lengths, taxon_missing_counts):
+                  missing_data_per_gene[gene_name] += missing_count_segment
+                  if missing_count_segment == gene_length:
+                       num_fully_missing_gene_segments += 1
+
+        statistics["Missing Data per Taxon (count)"] = missing_data_per_taxon
         statistics["Missing Data per Gene (count)"] = missing_data_per_gene
 
         if total_cells > 0:
@@ -554,24 +916,6 @@ class SequenceConcatenator:
             statistics["Percentage Overall Missing Data (%)"] = 0.0
 
         # Calculate Taxon-Gene Matrix Sparsity
-        num_genes_in_concat = len(self.__gene_info) # Number of genes with length > 0
-        num_expected_gene_segments = num_taxa * num_genes_in_concat if num_genes_in_concat > 0 else 0
-        num_fully_missing_gene_segments = 0
-
-        if num_expected_gene_segments > 0:
-             for taxon in taxons_in_concat:
-                  seq = self.__concatenated_sequences.get(taxon, "")
-                  for gene_info in self.__gene_info:
-                       gene_segment_length = gene_info['length']
-                       start_0based = gene_info['start'] - 1
-                       end_0based = gene_info['end']
-
-                       if seq and len(seq) >= end_0based:
-                            gene_segment = seq[start_0based:end_0based]
-                            if len(gene_segment) == gene_segment_length and all(char in ('-', '?') for char in gene_segment):
-                                 num_fully_missing_gene_segments += 1
-                       # else: Warning already printed in concatenation if padding failed
-
         if num_expected_gene_segments > 0:
              sparsity_percentage = (num_fully_missing_gene_segments / num_expected_gene_segments) * 100
              statistics["Taxon-Gene Matrix Sparsity (%)"] = round(sparsity_percentage, 2)
@@ -589,7 +933,7 @@ class SequenceConcatenator:
         if initial_reference_taxon:
             # Use the core calculation logic
             divergence_data = self._perform_divergence_calculation(
-                self.__concatenated_sequences,
+                concatenated_sequences,
                 self.__gene_info, # Pass the processed gene_info
                 taxons_in_concat, # Pass current taxons in concat
                 initial_reference_taxon # Calculate relative to the first taxon
@@ -653,57 +997,65 @@ class SequenceConcatenator:
              for gene in gene_info: # gene_info already only includes genes with length > 0
                  divergence_data[taxon][gene['name']] = "N/A"
 
+        # Precise percentage (as shown in the score string, rounded to 2 decimals) of every successfully scored
+        # {taxon: {gene_name: percentage}}, kept alongside the strings so the total score need not parse them back
+        score_percentages = {taxon: {} for taxon in taxons}
+        # Positions (in gene_info) of the scored genes in which each non-reference taxon has non-gap data,
+        # {taxon: set of gene indices}; gene names need not be unique, so genes are identified by position.
+        # Recorded while scoring so the 'No of charsets' count does not rescan the segments
+        genes_with_data = {taxon: set() for taxon in taxons}
+
 
         # Calculate per-gene differences and count non-gap charsets
         genes_for_divergence = gene_info # Use the filtered list
+        # (name, 0-based start, end, length) of each gene, looked up once rather than in every (taxon, gene) cell
+        gene_bounds = [(gene['name'], gene['start'] - 1, gene['end'], gene['length']) for gene in genes_for_divergence]
 
+        # A gene can only be scored if the reference sequence covers it
+        ref_covers_gene = []
+        for gene_name, start_0based, end_0based, gene_segment_length in gene_bounds:
+             # This check should ideally pass if data comes from a valid concatenated_sequences dict
+             if len(ref_seq) < end_0based:
+                  print(f"Internal Error: Reference taxon '{reference_taxon}' sequence unexpectedly shorter ({len(ref_seq)}) than end position ({end_0based}) for gene '{gene_name}'. Cannot calculate divergence for this gene.", file=sys.stderr)
+             ref_covers_gene.append(len(ref_seq) >= end_0based)
 
-        for gene in genes_for_divergence:
-             gene_name = gene['name']
-             start_0based = gene['start'] - 1
-             end_0based = gene['end']
-             gene_segment_length = gene['length'] # Use length from gene_info
+        # ASCII taxa are compared with the reference over the whole alignment at once; each gene's difference
+        # count is then a C-level bytes.count over its range. Taxa are handled one at a time (outer loop), so
+        # only one row of comparison bytes is alive at any point.
+        encoded_ref_seq = _encode_sequence(ref_seq)
 
-             # Get reference segment
-             ref_seq_full = concatenated_sequences.get(reference_taxon, "")
-             # This check should ideally pass if data comes from a valid concatenated_sequences dict
-             if len(ref_seq_full) < end_0based:
-                  print(f"Internal Error: Reference taxon '{reference_taxon}' sequence unexpectedly shorter ({len(ref_seq_full)}) than end position ({end_0based}) for gene '{gene_name}'. Cannot calculate divergence for this gene.", file=sys.stderr)
-                  for taxon in taxons: # Mark this gene as error for all taxons
+        for taxon in taxons:
+             taxon_seq = concatenated_sequences.get(taxon, "")
+             differing_sites = None
+             if taxon != reference_taxon and encoded_ref_seq is not None:
+                  encoded_taxon_seq = _encode_sequence(taxon_seq)
+                  if encoded_taxon_seq is not None:
+                       differing_sites = _differing_sites(encoded_ref_seq, encoded_taxon_seq, max(len(ref_seq), len(taxon_seq)))
+
+             for gene_index, ((gene_name, start_0based, end_0based, gene_segment_length), ref_covers) in enumerate(zip(gene_bounds, ref_covers_gene)):
+                  if not ref_covers:
+                       # Mark this gene as error for all taxons
                        divergence_data[taxon][gene_name] = "Error (Ref Seq Short)"
-                  continue
-             ref_segment = ref_seq_full[start_0based:end_0based]
-
+                       score_percentages[taxon].pop(gene_name, None)
+                       continue
 
-             # Calculate scores for each taxon relative to the reference taxon for this gene segment
-             for taxon in taxons:
                   # Reference taxon score is always 0 for its gene column
                   if taxon == reference_taxon:
                        # For gene columns in the reference row, it's 0%
                        divergence_data[taxon][gene_name] = f"0% #0 (0.00%)"
+                       score_percentages[taxon][gene_name] = 0.0
                        continue # Skip detailed comparison for reference taxon vs itself
 
-
-                  taxon_seq = concatenated_sequences.get(taxon, "")
                   if len(taxon_seq) < end_0based:
                        print(f"Internal Error: Taxon '{taxon}' sequence unexpectedly shorter ({len(taxon_seq)}) than end position ({end_0based}) for gene '{gene_name}'. Cannot calculate divergence for this gene.", file=sys.stderr)
                        divergence_data[taxon][gene_name] = "Error (Seq Short)"
+                       score_percentages[taxon].pop(gene_name, None)
                        continue
-                  taxon_segment = taxon_seq[start_0based:end_0based]
-
-                  diff_count = 0
-                  taxon_has_non_gap_in_gene_segment = False
-
-                  for j in range(gene_segment_length):
-                       ref_char = ref_segment[j]
-                       taxon_char = taxon_segment[j]
-
-                       if taxon_char not in ('-', '?'):
-                            taxon_has_non_gap_in_gene_segment = True
 
-                       if ref_char not in ('-', '?') and taxon_char not in ('-', '?'):
-                            if ref_char.upper() != taxon_char.upper():
-                                 diff_count += 1
+                  if differing_sites is not None:
+                       diff_count = (end_0based - start_0based) - differing_sites.count(0, start_0based, end_0based)
+                  else:
+                       diff_count = _count_differences(ref_seq[start_0based:end_0based], taxon_seq[start_0based:end_0based])
 
                   # Calculate percentage based on gene segment length
                   percentage = (diff_count / gene_segment_length) * 100 if gene_segment_length > 0 else 0.0
@@ -712,6 +1064,11 @@ class SequenceConcatenator:
                   leading_percent_int = max(0, min(99, leading_percent_int)) # Cap 0-99
 
                   divergence_data[taxon][gene_name] = f"{leading_percent_int}% #{diff_count} ({percentage:.2f}%)"
+                  score_percentages[taxon][gene_name] = round(percentage, 2)
+
+                  # A differing site is never a gap, so only a segment without differences needs to be checked for data
+                  if diff_count > 0 or _has_non_gap(taxon_seq, start_0based, end_0based):
+                       genes_with_data[taxon].add(gene_index)
 
                   # 'No of charsets' count is done below
 
@@ -725,30 +1082,24 @@ class SequenceConcatenator:
              total_percentage_sum = 0.0
              genes_counted_for_total_score = 0
              taxon_genes_with_data_count = 0 # Recalculate No of charsets here
+             # The taxon's sequence, length and scores are looked up once, not once per gene
+             taxon_seq = concatenated_sequences.get(taxon, "")
+             taxon_seq_length = len(taxon_seq)
+             taxon_score_percentages = score_percentages[taxon]
+             taxon_genes_with_data = genes_with_data[taxon]
+
+             for gene_index, (gene_name, start_0based, end_0based, _) in enumerate(gene_bounds): # Genes that actually had length > 0
+                  percentage_value = taxon_score_percentages.get(gene_name)
 
-             for gene in genes_that_contributed_length: # Iterate through genes that actually had length > 0
-                  gene_name = gene['name']
-                  gene_score_str = divergence_data[taxon].get(gene_name)
-
-                  # Check if the score was successfully calculated and get the precise percentage
-                  if gene_score_str and "N/A" not in gene_score_str and "Error" not in gene_score_str:
-                       match = re.search(r'\((\d+\.?\d*)%\)', gene_score_str)
-                       if match:
-                            try:
-                                 percentage_value = float(match.group(1))
-                                 total_percentage_sum += percentage_value
-                                 genes_counted_for_total_score += 1
-                            except ValueError:
-                                 print(f"Warning: Could not parse percentage from gene score string for taxon '{taxon}', gene '{gene_name}': {gene_score_str}. Skipping for total score calculation.", file=sys.stderr)
+                  # Check if the score was successfully calculated (not "N/A" or an error) and add its precise percentage
+                  if percentage_value is not None:
+                       total_percentage_sum += percentage_value
+                       genes_counted_for_total_score += 1
 
                        # Check if this gene contributed non-gap data for the taxon to count charsets
-                       taxon_seq = concatenated_sequences.get(taxon, "")
-                       start_0based = gene['start'] - 1
-                       end_0based = gene['end']
                        # Ensure sequence is long enough before slicing
-                       if taxon_seq and len(taxon_seq) >= end_0based:
-                            taxon_segment = taxon_seq[start_0based:end_0based]
-                            if any(char not in ('-', '?') for char in taxon_segment):
+                       if taxon_seq and taxon_seq_length >= end_0based:
+                            if gene_index in taxon_genes_with_data:
                                  taxon_genes_with_data_count += 1
                        else:
                             # This might happen if a taxon exists in __all_taxons but somehow didn't get a full padded sequence in concat
@@ -860,7 +1211,7 @@ if __name__ == "__main__":
              print(info)
 
         # Verify divergence data uses correct gene names and try recalculating
-        taxons_in_concat = sorted(list(concatenated.keys()))
+        taxons_in_concat = sorted(concatenated)
         if initial_divergence:
              print("\nInitial Divergence Data (Reference: First Taxon):")
              initial_ref = taxons_in_concat[0] if taxons_in_concat else None
@@ -0,0 +1,73 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SequenceConcatenator import SequenceConcatenator
+
+
+def nexus_file(matrix_rows, nchar=8, format_options=""):
+    """Wraps MATRIX rows in a minimal Nexus DATA block."""
+    return (["#NEXUS\n", "BEGIN DATA;\n", f"  DIMENSIONS NTAX=2 NCHAR={nchar};\n",
+             f"  FORMAT DATATYPE=DNA MISSING=? GAP=-{format_options};\n", "  MATRIX\n"]
+            + [row + "\n" for row in matrix_rows]
+            + ["  ;\n", "END;\n"])
+
+
+class ParseNexusTest(unittest.TestCase):
+
+    def parse(self, lines):
+        return SequenceConcatenator._parse_nexus(lines)
+
+    def test_sequential(self):
+        lines = nexus_file(["  TaxonA  ACGTACGT", "  TaxonB  acgt-cgt"])
+        self.assertEqual(self.parse(lines), {"TaxonA": "ACGTACGT", "TaxonB": "ACGT-CGT"})
+
+    def test_sequence_split_into_blocks(self):
+        lines = nexus_file(["  TaxonA  ACGT ACGT", "  TaxonB  AC GT -C GT [comment]"])
+        self.assertEqual(self.parse(lines), {"TaxonA": "ACGTACGT", "TaxonB": "ACGT-CGT"})
+
+    def test_wrapped_sequential_rows_with_blocks(self):
+        lines = nexus_file(["A ACGTACGT", "  ACGT ACGT", "B TTTTTTTT", "  TTTT TTTT"], nchar=16)
+        self.assertEqual(self.parse(lines), {"A": "ACGTACGTACGTACGT", "B": "TTTTTTTTTTTTTTTT"})
+
+    def test_name_on_its_own_line(self):
+        lines = nexus_file(["A", "ACGT", "ACGT", "B", "TTTT TTTT"])
+        self.assertEqual(self.parse(lines), {"A": "ACGTACGT", "B": "TTTTTTTT"})
+
+    def test_interleaved(self):
+        lines = nexus_file(["A ACGT", "B TTTT", "", "A ACGT", "B TT-T"], format_options=" INTERLEAVE")
+        self.assertEqual(self.parse(lines), {"A": "ACGTACGT", "B": "TTTTTT-T"})
+
+    def test_interleave_no_is_sequential(self):
+        lines = nexus_file(["A ACGT", "  ACGT", "B TTTTTTTT"], format_options=" INTERLEAVE=NO")
+        self.assertEqual(self.parse(lines), {"A": "ACGTACGT", "B": "TTTTTTTT"})
+
+    def test_quoted_names(self):
+        lines = nexus_file(["'O''Brien' ACGTACGT", "\"Taxon B\" TTTT TTTT"])
+        self.assertEqual(self.parse(lines), {"O'Brien": "ACGTACGT", "Taxon B": "TTTTTTTT"})
+
+    def test_terminating_semicolon_on_last_row(self):
+        lines = nexus_file(["A ACGTACGT", "B TTTTTTTT;"])[:-2] + ["END;\n"]
+        self.assertEqual(self.parse(lines), {"A": "ACGTACGT", "B": "TTTTTTTT"})
+
+    def test_without_nchar_single_tokens_continue_the_row(self):
+        lines = ["#NEXUS\n", "begin data;\n", "matrix\n", "A ACGT\n", "B AC\n", "GT\n", ";\n", "end;\n"]
+        self.assertEqual(self.parse(lines), {"A": "ACGT", "B": "ACGT"})
+
+    def test_no_matrix(self):
+        lines = ["#NEXUS\n", "BEGIN TAXA;\n", "  DIMENSIONS NTAX=2;\n", "END;\n"]
+        self.assertEqual(self.parse(lines), {})
+
+    def test_concatenation_of_nexus_gene(self):
+        nexus_gene = nexus_file(["A ACGTACGT", "  ACGT", "B TTTT TTTT TTTT"], nchar=12)
+        fasta_gene = [">A\n", "GATC\n", ">B\n", "CTAG\n"]
+        concatenator = SequenceConcatenator([nexus_gene, fasta_gene], ["nex", "fas"])
+        self.assertEqual(concatenator.get_concatenated_sequences(),
+                         {"A": "ACGTACGTACGTGATC", "B": "TTTTTTTTTTTTCTAG"})
+        self.assertEqual(concatenator.get_partition(), [("nex", "1-12", "DNA"), ("fas", "13-16", "DNA")])
+
+
+if __name__ == "__main__":
+    unittest.main()